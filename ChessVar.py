@@ -9,12 +9,24 @@
 # is no check or checkmate. All pieces behave the same as regular chess with the exception that there is no
 # castling, en passant, or pawn promotion.
 
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+
+
+# names of the squares in each row of the board, from rank 8 down to rank 1
+BOARD_SQUARES = tuple(tuple(column + str(rank) for column in 'abcdefgh') for rank in range(8, 0, -1))
+
+
 class ChessVar:
     """Represents the game state of a game of chess. Tracks whose turn it is, if a move is valid, updates the board
-    in the case of a valid move, initiates a capture if part of a legal move, and checks if the game is won. Takes no
-    parameters. Contains methods to check each move, and update the game accordingly. Uses ChessPiece (and any
-    inherited classes) objects to
-    represent the pieces & determine legal moves
+    in the case of a valid move, initiates a capture if part of a legal move, and checks if the game is won. Takes
+    optional parameters of the maximum number of legality results to remember (legal_cache_size) and whether to set
+    up the standard chess start (starting_position). With starting_position False the board is empty, ready for
+    load_position. Contains methods to check each move, and update the game accordingly. Uses ChessPiece (and any
+    inherited classes) objects to represent the pieces & determine legal moves
     Data members:   _game_state             Initialized to 'UNFINISHED'. Set to WHITE_WON or BLACK_WON in event of a win
                     _whose_turn             Initialized to 'white' and alternates to 'black' tracking which player's
                                             turn it is
@@ -24,9 +36,19 @@ class ChessVar:
                                             and value is the amount of that piece left to capture
                     _game_board             list of dictionaries which tracks the positions of the pieces. Initialized
                                             to the standard chess start. Within the lists, dictionary format is:
-                                            a1 (key) : ChessPiece object (value)"""
-
-    def __init__(self):
+                                            a1 (key) : ChessPiece object (value)
+                    _position_key           hashable snapshot of the current position, built on demand by
+                                            get_position_key and reset to None whenever the position changes
+                    _legal_cache            OrderedDict used as a least-recently-used cache of is_legal results for
+                                            the current position. Key is (origin, destination) and value is True or
+                                            False. Emptied whenever the position changes
+                    _legal_cache_size       maximum number of entries kept in _legal_cache
+                    _legal_cache_hits       number of is_legal calls answered from _legal_cache or _legal_moves
+                    _legal_cache_misses     number of is_legal calls that had to validate the move
+                    _legal_moves            tuple of (list of legal moves, set of legal moves) for the current
+                                            position, or None if they haven't been worked out"""
+
+    def __init__(self, legal_cache_size=1024, starting_position=True):
         """initialize data members of ChessVar"""
         self._game_state = "UNFINISHED"             # string
         self._whose_turn = "white"                  # string
@@ -43,26 +65,38 @@ class ChessVar:
                                    'queen': 1,
                                    'king': 1}
 
-        self._game_board = [                        # list of dictionaries
-            {'a8': Rook("rook", "black", 'a8'), 'b8': Knight("knight", "black", 'b8'),
-             'c8': Bishop("bishop", "black", 'c8'), 'd8': Queen("queen", "black", 'd8'),
-             'e8': King("king", "black", 'e8'), 'f8': Bishop("bishop", "black", 'f8'),
-             'g8': Knight("knight", "black", 'g8'), 'h8': Rook("rook", "black", 'h8')},
-            {'a7': Pawn("pawn", "black", 'a7'), 'b7': Pawn("pawn", "black", 'b7'), 'c7': Pawn("pawn", "black", 'c7'),
-             'd7': Pawn("pawn", "black", 'd7'), 'e7': Pawn("pawn", "black", 'e7'), 'f7': Pawn("pawn", "black", 'f7'),
-             'g7': Pawn("pawn", "black", 'g7'), 'h7': Pawn("pawn", "black", 'h7')},
-            {'a6': None, 'b6': None, 'c6': None, 'd6': None, 'e6': None, 'f6': None, 'g6': None, 'h6': None},
-            {'a5': None, 'b5': None, 'c5': None, 'd5': None, 'e5': None, 'f5': None, 'g5': None, 'h5': None},
-            {'a4': None, 'b4': None, 'c4': None, 'd4': None, 'e4': None, 'f4': None, 'g4': None, 'h4': None},
-            {'a3': None, 'b3': None, 'c3': None, 'd3': None, 'e3': None, 'f3': None, 'g3': None, 'h3': None},
-            {'a2': Pawn("pawn", "white", 'a2'), 'b2': Pawn("pawn", "white", 'b2'), 'c2': Pawn("pawn", "white", 'c2'),
-             'd2': Pawn("pawn", "white", 'd2'), 'e2': Pawn("pawn", "white", 'e2'), 'f2': Pawn("pawn", "white", 'f2'),
-             'g2': Pawn("pawn", "white", 'g2'), 'h2': Pawn("pawn", "white", 'h2')},
-            {'a1': Rook("rook", "white", "a1"), 'b1': Knight("knight", "white", "b1"),
-             'c1': Bishop("bishop", "white", "c1"), 'd1': Queen("queen", "white", 'd1'),
-             'e1': King("king ", "white", "e1"), 'f1': Bishop("bishop", "white", 'f1'),
-             'g1': Knight("knight", "white", 'g1'), 'h1': Rook("rook", "white", 'h1')}
-            ]
+        if starting_position:
+            self._game_board = [                        # list of dictionaries
+                {'a8': Rook("rook", "black", 'a8'), 'b8': Knight("knight", "black", 'b8'),
+                 'c8': Bishop("bishop", "black", 'c8'), 'd8': Queen("queen", "black", 'd8'),
+                 'e8': King("king", "black", 'e8'), 'f8': Bishop("bishop", "black", 'f8'),
+                 'g8': Knight("knight", "black", 'g8'), 'h8': Rook("rook", "black", 'h8')},
+                {'a7': Pawn("pawn", "black", 'a7'), 'b7': Pawn("pawn", "black", 'b7'),
+                 'c7': Pawn("pawn", "black", 'c7'), 'd7': Pawn("pawn", "black", 'd7'),
+                 'e7': Pawn("pawn", "black", 'e7'), 'f7': Pawn("pawn", "black", 'f7'),
+                 'g7': Pawn("pawn", "black", 'g7'), 'h7': Pawn("pawn", "black", 'h7')},
+                {'a6': None, 'b6': None, 'c6': None, 'd6': None, 'e6': None, 'f6': None, 'g6': None, 'h6': None},
+                {'a5': None, 'b5': None, 'c5': None, 'd5': None, 'e5': None, 'f5': None, 'g5': None, 'h5': None},
+                {'a4': None, 'b4': None, 'c4': None, 'd4': None, 'e4': None, 'f4': None, 'g4': None, 'h4': None},
+                {'a3': None, 'b3': None, 'c3': None, 'd3': None, 'e3': None, 'f3': None, 'g3': None, 'h3': None},
+                {'a2': Pawn("pawn", "white", 'a2'), 'b2': Pawn("pawn", "white", 'b2'),
+                 'c2': Pawn("pawn", "white", 'c2'), 'd2': Pawn("pawn", "white", 'd2'),
+                 'e2': Pawn("pawn", "white", 'e2'), 'f2': Pawn("pawn", "white", 'f2'),
+                 'g2': Pawn("pawn", "white", 'g2'), 'h2': Pawn("pawn", "white", 'h2')},
+                {'a1': Rook("rook", "white", "a1"), 'b1': Knight("knight", "white", "b1"),
+                 'c1': Bishop("bishop", "white", "c1"), 'd1': Queen("queen", "white", 'd1'),
+                 'e1': King("king", "white", "e1"), 'f1': Bishop("bishop", "white", 'f1'),
+                 'g1': Knight("knight", "white", 'g1'), 'h1': Rook("rook", "white", 'h1')}
+                ]
+        else:
+            self._game_board = [dict.fromkeys(row) for row in BOARD_SQUARES]
+
+        self._position_key = None                   # tuple
+        self._legal_cache = OrderedDict()           # ordered dictionary
+        self._legal_cache_size = legal_cache_size   # integer
+        self._legal_cache_hits = 0                  # integer
+        self._legal_cache_misses = 0                # integer
+        self._legal_moves = None                    # tuple
 
     def get_game_state(self):
         """Get method which returns the game state"""
@@ -71,6 +105,7 @@ class ChessVar:
     def set_game_state(self, update):
         """Set method for the game state"""
         self._game_state = update
+        self.position_changed()
 
     def get_whose_turn(self):
         """Get method on whose turn it is"""
@@ -80,12 +115,179 @@ class ChessVar:
         """Get method which returns the game board"""
         return self._game_board
 
+    def get_captured_by_white(self):
+        """Get method which returns the dictionary of pieces left for the white player to capture"""
+        return self._captured_by_white
+
+    def get_captured_by_black(self):
+        """Get method which returns the dictionary of pieces left for the black player to capture"""
+        return self._captured_by_black
+
+    def load_position(self, pieces, whose_turn, game_state, captured_by_white, captured_by_black):
+        """Replaces the current position. Takes parameters of a dictionary of the occupied squares (location (key) :
+        ChessPiece object (value), any square left out is empty), whose turn it is, the game state, and the
+        dictionaries of pieces left to capture by each player. Returns nothing"""
+        for row in self._game_board:
+            for key in row:
+                row[key] = pieces.get(key)
+        self._whose_turn = whose_turn
+        self._game_state = game_state
+        self._captured_by_white = dict(captured_by_white)
+        self._captured_by_black = dict(captured_by_black)
+        self.position_changed()
+
+    def copy_game(self, legal_cache_size=1024):
+        """Returns a new ChessVar in the same position, with its own copies of the pieces. Takes an optional parameter
+        of the new game's legal_cache_size. Nothing cached for this game is copied"""
+        pieces = {}
+        for row in self._game_board:
+            for key in row:
+                piece = row[key]
+                if piece is not None:
+                    pieces[key] = type(piece)(piece.get_piece_type(), piece.get_color(), key)
+                    if type(piece) == Pawn and piece.get_has_moved():
+                        pieces[key].set_has_moved()
+        game = ChessVar(legal_cache_size, starting_position=False)
+        game.load_position(pieces, self._whose_turn, self._game_state, self._captured_by_white,
+                           self._captured_by_black)
+        return game
+
+    def position_changed(self):
+        """Forgets everything worked out for the old position: the position key, the is_legal cache and the stored
+        legal moves. Called by move_piece, next_turn, set_game_state and load_position. Changes made directly to the
+        list returned by get_game_board are not tracked, so call this after making any. Takes no parameters and
+        returns nothing"""
+        self._position_key = None
+        if self._legal_cache:
+            self._legal_cache.clear()
+        self._legal_moves = None
+
+    def get_position_key(self):
+        """Returns a hashable snapshot of everything move legality depends on: whose turn it is, the game state, and
+        the type, color and (for pawns) has-moved flag of the piece on each square. Used to check whether two games
+        (e.g. a game and a copy of it) are in the same position. Built on the first call for each position."""
+        if self._position_key is None:
+            squares = []
+            for row in self._game_board:
+                for key in row:
+                    piece = row[key]
+                    if piece is None:
+                        squares.append(None)
+                    elif type(piece) == Pawn:
+                        squares.append((type(piece).__name__, piece.get_color(), piece.get_has_moved()))
+                    else:
+                        squares.append((type(piece).__name__, piece.get_color()))
+            self._position_key = (self._whose_turn, self._game_state, tuple(squares))
+        return self._position_key
+
+    def is_legal(self, origen_loc, destination_loc):
+        """Takes two parameters, the origin location and destination location as strings. Returns True if make_move
+        would accept the move in the current position and False otherwise, without changing the game. Results are
+        kept in a least-recently-used cache of moves, so repeated queries against the same position (e.g.
+        drag-and-drop previews) skip the validation. The cache is emptied whenever the position changes."""
+        # if every legal move in this position is already known, answer from that
+        if self._legal_moves is not None:
+            self._legal_cache_hits += 1
+            return (origen_loc, destination_loc) in self._legal_moves[1]
+
+        key = (origen_loc, destination_loc)
+        if key in self._legal_cache:
+            self._legal_cache.move_to_end(key)
+            self._legal_cache_hits += 1
+            return self._legal_cache[key]
+
+        self._legal_cache_misses += 1
+        legal = self.validate_move(origen_loc, destination_loc)
+        self._legal_cache[key] = legal
+        # drop the least recently used entry once we're over the size limit
+        if len(self._legal_cache) > self._legal_cache_size:
+            self._legal_cache.popitem(last=False)
+        return legal
+
+    def get_legal_cache_info(self):
+        """Get method which returns a dictionary of is_legal cache statistics: hits, misses, the maximum size of the
+        cache (maxsize) and the number of entries currently in it (currsize)"""
+        return {'hits': self._legal_cache_hits,
+                'misses': self._legal_cache_misses,
+                'maxsize': self._legal_cache_size,
+                'currsize': len(self._legal_cache)}
+
+    def clear_legal_cache(self):
+        """Removes every entry from the is_legal cache and forgets the stored get_legal_moves result. The hit and
+        miss counts are kept. Takes no parameters and returns nothing"""
+        self._legal_cache.clear()
+        self._legal_moves = None
+
+    def get_legal_moves(self):
+        """Returns a list of every legal move for the player whose turn it is, as (origin, destination) tuples.
+        Checks each square holding one of the player's pieces against every square on the board. The result is
+        stored for the current position, so repeated calls (and is_legal calls) in the same position don't
+        recalculate it."""
+        if self._legal_moves is None:
+            moves = []
+            for origin_row in self._game_board:
+                for origin in origin_row:
+                    # only squares holding the current player's pieces can be the origin of a legal move
+                    if origin_row[origin] is None or origin_row[origin].get_color() != self._whose_turn:
+                        continue
+                    for destination_row in self._game_board:
+                        for destination in destination_row:
+                            if self.validate_move(origin, destination):
+                                moves.append((origin, destination))
+            self._legal_moves = (moves, set(moves))
+        return list(self._legal_moves[0])
+
+    def prime_legal_moves(self, position_key, moves):
+        """Stores a list of legal moves worked out elsewhere (e.g. by an AnalysisSession on a copy of the game) so
+        get_legal_moves and is_legal can use it. Takes parameters of the position key the moves were calculated
+        for and the list of (origin, destination) tuples. The moves are only stored if the position key matches
+        the current position. Returns True if they were stored, and False otherwise."""
+        if position_key != self.get_position_key():
+            return False
+        moves = list(moves)
+        self._legal_moves = (moves, set(moves))
+        return True
+
     def make_move(self, origen_loc, destination_loc):
         """Takes two parameters, the origin location and destination location as strings. Checks to see if the move
         indicated is valid, if it results in a capture and updates the game board accordingly. Manages whose turn
         it is, the game state, and how many pieces have been captured by each player. Returns True if the
         method is valid & has been completed, and False otherwise."""
 
+        # check the move against the current position, using anything already worked out for it. This reads the
+        # cache directly so the hit/miss counts only cover is_legal queries, and doesn't store an answer the move is
+        # about to make out of date
+        if self._legal_moves is not None:
+            legal = (origen_loc, destination_loc) in self._legal_moves[1]
+        elif (origen_loc, destination_loc) in self._legal_cache:
+            legal = self._legal_cache[(origen_loc, destination_loc)]
+        else:
+            legal = self.validate_move(origen_loc, destination_loc)
+        if not legal:
+            return False
+
+        # if we're here, the move is valid. Board rows run from rank 8 (index 0) down to rank 1 (index 7)
+        origin_row = 8 - int(origen_loc[1])
+        destination_row = 8 - int(destination_loc[1])
+
+        # check if the destination location holds a piece of the opposite player, and initiate capture if so
+        if self._game_board[destination_row][destination_loc] is not None:
+            if self._game_board[destination_row][destination_loc].get_color() != self._whose_turn:
+                self.capture(destination_row, destination_loc)
+
+        # move piece at origin to destination, and set origin to None
+        self.move_piece(destination_row, destination_loc, origin_row, origen_loc)
+        # check if a capture has caused a player to win
+        self.check_for_win()
+        # after successful move, change whose turn it is
+        self.next_turn()
+        return True
+
+    def validate_move(self, origen_loc, destination_loc):
+        """Takes two parameters, the origin location and destination location as strings. Checks to see if the move
+        indicated is valid for the player whose turn it is, using the possible_moves method for the piece at the
+        origin. Does not change the game. Returns True if the move is valid, and False otherwise."""
+
         # initialize valid_origin and destination checks to False
         valid_origin = False
         valid_destination = False
@@ -174,18 +376,7 @@ class ChessVar:
 
                 return False
 
-        # if we're here, the move is valid. Update game info & return True
-        # check if the destination location holds a piece of the opposite player, and initiate capture if so
-        if self._game_board[destination_count - 1][destination_loc] is not None:
-            if self._game_board[destination_count - 1][destination_loc].get_color() != self._whose_turn:
-                self.capture(destination_count - 1, destination_loc)
-
-        # move piece at origin to destination, and set origin to None
-        self.move_piece(destination_count - 1, destination_loc, origin_count - 1, origen_loc)
-        # check if a capture has caused a player to win
-        self.check_for_win()
-        # after successful move, change whose turn it is
-        self.next_turn()
+        # if we're here, the move is valid
         return True
 
     def move_piece(self, dest_row, dest_loc, origin_row, origin_loc):
@@ -197,6 +388,7 @@ class ChessVar:
         self._game_board[dest_row][dest_loc] = self._game_board[origin_row][origin_loc]
         self._game_board[dest_row][dest_loc].set_location(dest_loc)
         self._game_board[origin_row][origin_loc] = None
+        self.position_changed()
         # if the piece is a pawn, update it's 'has moved' data member to True
         if type(self._game_board[dest_row][dest_loc]) == Pawn:
             self._game_board[dest_row][dest_loc].set_has_moved()
@@ -393,6 +585,11 @@ class ChessVar:
         dest_x_coord = self.convert_to_num(dest_loc[0])
         dest_y_coord = int(dest_loc[1])
 
+        # if the destination isn't on a diagonal from the current location, return a blank list as there are no
+        # valid moves (otherwise the loops below would walk off the board)
+        if abs(dest_x_coord - cur_x_coordinate) != abs(dest_y_coord - cur_y_coordinate):
+            return char_bishop_moves
+
         # if destination is 'up and to the right'
         if dest_x_coord > cur_x_coordinate and dest_y_coord > cur_y_coordinate:
             # go 'up and to the right' one square at a time, checking if there's a piece there already
@@ -607,6 +804,7 @@ class ChessVar:
 
     def next_turn(self):
         """swaps which player's turn it is. Takes no parameters and returns nothing"""
+        self.position_changed()
         if self._whose_turn == 'white':
             self._whose_turn = 'black'
             return
@@ -723,6 +921,317 @@ class King(ChessPiece):
         super().__init__(piece_type, color, location)
 
 
+class AnalysisSession:
+    """Thinks ahead on a ChessVar game in a background thread while waiting for the next move. For every legal move
+    in the current position, the thread plays the move on a copy of the game and works out the legal replies. When
+    the real move is made through the session's make_move method, the replies already worked out for that move are
+    handed to the game, so get_legal_moves and is_legal answer without recalculating. Takes parameters of the
+    ChessVar game and an optional progress callback, which is called from the background thread with the number of
+    moves looked at so far and the total number of moves to look at. If the search raises an exception (including
+    one from the progress callback), it stops and the exception is available from get_error.
+    Data members:   _game                   ChessVar object being analyzed. Only read and changed on the caller's thread
+                    _progress_callback      function called with (completed, total) after each move is looked at,
+                                            or None
+                    _active                 True between start and stop. While True, make_move restarts the search
+                                            on the new position
+                    _thread                 background thread running search, or None
+                    _stop_event             threading.Event used to cancel the running search
+                    _lock                   threading.Lock guarding _results, _completed and _total
+                    _position_key           position key of the game when the running search started
+                    _results                dictionary of finished results. Key is a move (origin, destination) and
+                                            value is a tuple of (position key after the move, list of legal replies)
+                    _completed              number of moves looked at so far
+                    _total                  number of moves to look at
+                    _error                  exception that stopped the last search, or None"""
+
+    def __init__(self, game, progress_callback=None):
+        """initialize data members of AnalysisSession"""
+        self._game = game                               # ChessVar
+        self._progress_callback = progress_callback     # function
+        self._active = False                            # boolean
+        self._thread = None                             # threading.Thread
+        self._stop_event = threading.Event()            # threading.Event
+        self._lock = threading.Lock()                   # threading.Lock
+        self._position_key = None                       # tuple
+        self._results = {}                              # dictionary
+        self._completed = 0                             # integer
+        self._total = 0                                 # integer
+        self._error = None                              # exception
+
+    def get_game(self):
+        """Get method which returns the game being analyzed"""
+        return self._game
+
+    def is_running(self):
+        """Returns True if the background search is still running, and False otherwise"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_progress(self):
+        """Returns a tuple of the number of moves looked at so far and the total number of moves to look at"""
+        with self._lock:
+            return self._completed, self._total
+
+    def get_error(self):
+        """Returns the exception that stopped the last search, or None if it didn't fail"""
+        with self._lock:
+            return self._error
+
+    def get_results(self):
+        """Returns a copy of the finished results: a dictionary with moves (origin, destination) as keys and lists
+        of the legal replies to that move as values"""
+        with self._lock:
+            return {move: list(self._results[move][1]) for move in self._results}
+
+    def start(self, moves=None):
+        """Starts searching the current position in a background thread. Takes an optional parameter of the legal
+        moves in the current position, if they're already known, so the search doesn't work them out again. Does
+        nothing if a search is already running or the game is over. Returns nothing"""
+        self._active = True
+        if self.is_running() or self._game.get_game_state() != "UNFINISHED":
+            return
+        # the thread only ever works on its own copy, so the game itself can't change underneath it
+        snapshot = self._game.copy_game(legal_cache_size=0)
+        self._position_key = snapshot.get_position_key()
+        if moves is not None:
+            snapshot.prime_legal_moves(self._position_key, moves)
+        with self._lock:
+            self._results = {}
+            self._completed = 0
+            self._total = 0
+            self._error = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self.search, args=(snapshot, self._stop_event), daemon=True)
+        self._thread.start()
+
+    def search(self, snapshot, stop_event):
+        """Runs in the background thread. Takes parameters of the copy of the game to search and the event that
+        cancels the search. Plays each legal move on a further copy and stores the legal replies, stopping early
+        if stop_event is set. Any exception stops the search and is stored for get_error. Returns nothing"""
+        try:
+            moves = snapshot.get_legal_moves()
+            with self._lock:
+                self._total = len(moves)
+            for move in moves:
+                if stop_event.is_set():
+                    return
+                child = snapshot.copy_game(legal_cache_size=0)
+                child.make_move(move[0], move[1])
+                replies = child.get_legal_moves()
+                with self._lock:
+                    self._results[move] = (child.get_position_key(), replies)
+                    self._completed += 1
+                    completed = self._completed
+                    total = self._total
+                if self._progress_callback is not None:
+                    self._progress_callback(completed, total)
+        except Exception as error:
+            with self._lock:
+                self._error = error
+
+    def cancel(self):
+        """Cancels the running search (if any) and waits for the background thread to finish. Results found so far
+        are kept. Takes no parameters and returns nothing"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stop(self):
+        """Cancels the running search and stops make_move from starting a new one. Takes no parameters and returns
+        nothing"""
+        self._active = False
+        self.cancel()
+
+    def make_move(self, origen_loc, destination_loc):
+        """Takes two parameters, the origin location and destination location as strings. Cancels the search, makes
+        the move on the game and, if the search had already looked at this move, hands the legal replies it found
+        to the game. If the session was started, searching resumes on the new position, starting from those
+        replies. Returns the result of the game's make_move."""
+        self.cancel()
+        found = None
+        # results only apply if the game is still in the position the search started from
+        if self._position_key == self._game.get_position_key():
+            with self._lock:
+                found = self._results.get((origen_loc, destination_loc))
+        moved = self._game.make_move(origen_loc, destination_loc)
+        if moved and found is not None and self._game.prime_legal_moves(found[0], found[1]):
+            replies = found[1]
+        else:
+            replies = None
+        if self._active:
+            self.start(replies)
+        return moved
+
+
+class GameStore:
+    """Holds many game states in a block of shared memory so several processes can work on them without pickling
+    ChessVar objects. Each game is stored as a fixed-size record: one byte per square for the board, whose turn it
+    is, the game state, the pieces left to capture by each player, and a bitmask of the squares holding pawns that
+    have moved. Takes parameters of the number of games to hold (capacity) to create a new store, or the name of an
+    existing store (name) to attach to it from another process. Each process should only change the games it has
+    been given, as records are not locked. Only the process that created the store unlinks it: attaching doesn't
+    hand the shared memory to the attaching process's resource tracker, so a worker exiting doesn't remove it.
+    Data members:   _shared_memory          multiprocessing.shared_memory.SharedMemory object holding the header
+                                            (capacity and the creator's resource tracker process id) followed by the
+                                            game records
+                    _capacity               number of game records in the store"""
+
+    # board (64 squares, a8 first), whose turn, game state, pieces left to capture by white then by black (pawn,
+    # rook, knight, bishop, queen, king) and the moved-pawn bitmask
+    RECORD = struct.Struct('<64sBB6s6sQ')
+    HEADER = struct.Struct('<QQ')
+    PIECE_CODES = {Pawn: 1, Rook: 2, Knight: 3, Bishop: 4, Queen: 5, King: 6}
+    PIECE_NAMES = {1: (Pawn, 'pawn'), 2: (Rook, 'rook'), 3: (Knight, 'knight'), 4: (Bishop, 'bishop'),
+                   5: (Queen, 'queen'), 6: (King, 'king')}
+    BLACK = 8
+    PIECE_ORDER = ('pawn', 'rook', 'knight', 'bishop', 'queen', 'king')
+    GAME_STATES = ('UNFINISHED', 'WHITE_WON', 'BLACK_WON')
+    SQUARES = tuple(square for row in BOARD_SQUARES for square in row)
+    SQUARE_INDEXES = {square: index for index, square in enumerate(SQUARES)}
+
+    def __init__(self, capacity=None, name=None):
+        """initialize data members of GameStore, creating new shared memory if no name is given"""
+        if name is None:
+            if capacity is None or capacity < 1:
+                raise ValueError("capacity must be at least 1 when creating a GameStore")
+            size = self.HEADER.size + capacity * self.RECORD.size
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=size)
+            self._capacity = capacity
+            # record which resource tracker owns the memory, so attaching processes can tell if they share it
+            self.HEADER.pack_into(self._shared_memory.buf, 0, capacity, resource_tracker._resource_tracker._pid or 0)
+            # encode the standard start once and copy it into every other record
+            self.reset_game(0)
+            start = self.get_offset(0)
+            record = bytes(self._shared_memory.buf[start:start + self.RECORD.size])
+            self._shared_memory.buf[start + self.RECORD.size:size] = record * (capacity - 1)
+        elif sys.version_info >= (3, 13):
+            self._shared_memory = shared_memory.SharedMemory(name=name, track=False)
+            self._capacity = self.HEADER.unpack_from(self._shared_memory.buf, 0)[0]
+        else:
+            # before 3.13 attaching always registers the memory with this process's resource tracker, which unlinks
+            # it when the process exits. Undo that unless the tracker is the creator's (e.g. a multiprocessing child
+            # inheriting it), where unregistering would drop the creator's own registration
+            tracker = resource_tracker._resource_tracker
+            inherited = tracker._fd is not None
+            tracker_pid = tracker._pid
+            self._shared_memory = shared_memory.SharedMemory(name=name)
+            self._capacity, creator_tracker_pid = self.HEADER.unpack_from(self._shared_memory.buf, 0)
+            if not inherited or (tracker_pid is not None and tracker_pid != creator_tracker_pid):
+                resource_tracker.unregister(self._shared_memory._name, "shared_memory")
+
+    def get_name(self):
+        """Get method which returns the name other processes use to attach to the store"""
+        return self._shared_memory.name
+
+    def get_capacity(self):
+        """Get method which returns the number of games the store holds"""
+        return self._capacity
+
+    def get_offset(self, index):
+        """Returns the byte offset of the record for the game at index. Raises IndexError if index is out of range"""
+        if not 0 <= index < self._capacity:
+            raise IndexError("game index out of range")
+        return self.HEADER.size + index * self.RECORD.size
+
+    def reset_game(self, index):
+        """Sets the game at index to the standard chess start. Returns nothing"""
+        self.save_game(index, ChessVar(legal_cache_size=0))
+
+    def save_game(self, index, game):
+        """Writes the position of a ChessVar game into the record at index. Returns nothing"""
+        board = bytearray(64)
+        pawn_moved = 0
+        square = 0
+        for row in game.get_game_board():
+            for key in row:
+                piece = row[key]
+                if piece is not None:
+                    board[square] = self.PIECE_CODES[type(piece)]
+                    if piece.get_color() == 'black':
+                        board[square] += self.BLACK
+                    if type(piece) == Pawn and piece.get_has_moved():
+                        pawn_moved |= 1 << square
+                square += 1
+        captured_by_white = bytes(game.get_captured_by_white()[piece] for piece in self.PIECE_ORDER)
+        captured_by_black = bytes(game.get_captured_by_black()[piece] for piece in self.PIECE_ORDER)
+        self.RECORD.pack_into(self._shared_memory.buf, self.get_offset(index), bytes(board),
+                              0 if game.get_whose_turn() == 'white' else 1,
+                              self.GAME_STATES.index(game.get_game_state()),
+                              captured_by_white, captured_by_black, pawn_moved)
+
+    def load_game(self, index):
+        """Returns a new ChessVar game built from the record at index. The game's is_legal cache is switched off, as
+        these games are usually only used for one move"""
+        return self.build_game(self.RECORD.unpack_from(self._shared_memory.buf, self.get_offset(index)))
+
+    def build_game(self, record):
+        """Returns a new ChessVar game built from an unpacked record (a tuple of the RECORD fields)"""
+        board, turn, state, captured_by_white, captured_by_black, pawn_moved = record
+        pieces = {}
+        for square in range(64):
+            code = board[square]
+            if code == 0:
+                continue
+            color = 'black' if code & self.BLACK else 'white'
+            piece_class, piece_type = self.PIECE_NAMES[code & ~self.BLACK]
+            location = self.SQUARES[square]
+            piece = piece_class(piece_type, color, location)
+            if piece_class == Pawn and pawn_moved & (1 << square):
+                piece.set_has_moved()
+            pieces[location] = piece
+        # start from an empty board, so no pieces are built only to be replaced
+        game = ChessVar(legal_cache_size=0, starting_position=False)
+        game.load_position(pieces, 'white' if turn == 0 else 'black', self.GAME_STATES[state],
+                           dict(zip(self.PIECE_ORDER, captured_by_white)),
+                           dict(zip(self.PIECE_ORDER, captured_by_black)))
+        return game
+
+    def apply_move(self, index, origen_loc, destination_loc):
+        """Takes parameters of the game index and the origin and destination locations as strings. Plays the move
+        with ChessVar's rules and writes the result back into the same record. Returns True if the move was made,
+        and False otherwise (the record is left unchanged)."""
+        offset = self.get_offset(index)
+        record = self.RECORD.unpack_from(self._shared_memory.buf, offset)
+        game = self.build_game(record)
+        if not game.make_move(origen_loc, destination_loc):
+            return False
+        # only the origin and destination squares change, so update those rather than re-encoding the whole board
+        board = bytearray(record[0])
+        pawn_moved = record[5]
+        origin = self.SQUARE_INDEXES[origen_loc]
+        destination = self.SQUARE_INDEXES[destination_loc]
+        board[destination] = board[origin]
+        board[origin] = 0
+        pawn_moved &= ~(1 << origin | 1 << destination)
+        if board[destination] & ~self.BLACK == self.PIECE_CODES[Pawn]:
+            pawn_moved |= 1 << destination
+        captured_by_white = bytes(game.get_captured_by_white()[piece] for piece in self.PIECE_ORDER)
+        captured_by_black = bytes(game.get_captured_by_black()[piece] for piece in self.PIECE_ORDER)
+        self.RECORD.pack_into(self._shared_memory.buf, offset, bytes(board),
+                              0 if game.get_whose_turn() == 'white' else 1,
+                              self.GAME_STATES.index(game.get_game_state()),
+                              captured_by_white, captured_by_black, pawn_moved)
+        return True
+
+    def get_whose_turn(self, index):
+        """Returns whose turn it is in the game at index, read straight from the record"""
+        turn = self._shared_memory.buf[self.get_offset(index) + 64]
+        return 'white' if turn == 0 else 'black'
+
+    def get_game_state(self, index):
+        """Returns the game state of the game at index, read straight from the record"""
+        return self.GAME_STATES[self._shared_memory.buf[self.get_offset(index) + 65]]
+
+    def close(self):
+        """Detaches this process from the shared memory. Takes no parameters and returns nothing"""
+        self._shared_memory.close()
+
+    def unlink(self):
+        """Frees the shared memory. Should be called once, by the process that created the store, after every
+        process has closed it. Takes no parameters and returns nothing"""
+        self._shared_memory.unlink()
+
+
 def main():
     """Holds the code to be executed as script"""
     board = ChessVar()
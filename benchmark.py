@@ -0,0 +1,251 @@
+# Author: Mark Roetcisoender
+# GitHub username: mark-roetcisoender
+# Date: 10/19/26
+# Description: Performance benchmarks for ChessVar. Times ChessVar() construction, make_move on legal and illegal
+# moves for each type of piece, replaying a full recorded game, and print_board, and measures the memory used by one
+# game. Each timing is warmed up first and then repeated, keeping the best run. Results are written to a JSON file
+# and compared with a stored baseline; the script exits with status 1 if any metric is worse than the baseline by
+# more than the threshold, or is missing. Timings are allowed 50% by default, so a halving of throughput always
+# fails while run to run noise doesn't. Memory is nearly deterministic, so it's allowed 5% by default.
+#
+# Usage:
+#     python benchmark.py --save-baseline         record the baseline on this machine
+#     python benchmark.py                         compare against it
+#     python benchmark.py --require-baseline      compare, and fail if there's no baseline (for CI)
+
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from ChessVar import ChessVar
+
+# moves played from the start so that every type of white piece has a legal move available
+OPENING = [("e2", "e4"), ("e7", "e5"), ("a2", "a4"), ("a7", "a5")]
+
+# a legal and an illegal move for each type of piece, from the position after OPENING
+PIECE_MOVES = {'pawn': (("d2", "d4"), ("d2", "d5")),
+               'rook': (("a1", "a3"), ("a1", "a6")),
+               'knight': (("g1", "f3"), ("g1", "g3")),
+               'bishop': (("f1", "c4"), ("f1", "f3")),
+               'queen': (("d1", "h5"), ("d1", "d3")),
+               'king': (("e1", "e2"), ("e1", "e3"))}
+
+# a recorded 67 move game, won by white capturing the black queen
+RECORDED_GAME = ("d2d3 h7h6 b1d2 a7a6 d2b1 g7g5 c1e3 f8g7 h2h4 a8a7 h1h3 g7f8 a2a3 g5g4 e3g5 b7b5 f2f3 a6a5 c2c4 "
+                 "f7f5 e1d2 c7c5 d2e1 d8c7 c4b5 a7a8 d1d2 e7e5 b5b6 c8b7 f3f4 b8a6 h3e3 a8c8 e1d1 b7g2 b2b4 g2h3 "
+                 "a1a2 c5b4 b1c3 h3g2 d1c2 f8d6 a2a1 e8f7 g5d8 c7a7 a1a2 a7b7 e3e4 g2f3 d2c1 b4c3 c2d2 a6c7 f1h3 "
+                 "f7e6 g1f3 d6b4 c1b2 g4h3 b2a1 h3h2 d3d4 e6e7 d8e7").split()
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+def time_operation(prepare, run, number, repeat, warmup):
+    """Times an operation and returns the best time per operation in seconds. Takes parameters of a function that
+    prepares the input for one timed batch (not timed), a function that runs the batch on that input, the number
+    of operations in a batch, the number of timed batches, and the number of untimed warmup batches. The garbage
+    collector is switched off while timing, as timeit does."""
+    for _ in range(warmup):
+        run(prepare())
+    best = None
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            data = prepare()
+            start = time.perf_counter()
+            run(data)
+            elapsed = time.perf_counter() - start
+            if best is None or elapsed < best:
+                best = elapsed
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best / number
+
+
+def opening_game():
+    """Returns a new ChessVar game with OPENING played and the is_legal cache switched off, so every make_move
+    call runs the full validation"""
+    game = ChessVar(legal_cache_size=0)
+    for origin, destination in OPENING:
+        game.make_move(origin, destination)
+    return game
+
+
+def bench_construction(number, repeat, warmup):
+    """Returns the time to construct one ChessVar"""
+    def run(data):
+        for _ in range(number):
+            ChessVar()
+    return time_operation(lambda: None, run, number, repeat, warmup)
+
+
+def bench_make_move(move, expected, number, repeat, warmup):
+    """Returns the time for one make_move call on a game after OPENING. Takes parameters of the move as an
+    (origin, destination) tuple, the result make_move should give for it, and the timing settings. Raises
+    RuntimeError if make_move gives a different result, as the benchmark would then be timing a different path
+    through the rules. Each call gets its own copy of the game, made before timing starts"""
+    template = opening_game()
+    if template.copy_game(legal_cache_size=0).make_move(move[0], move[1]) != expected:
+        raise RuntimeError(f"make_move{move} should return {expected} after the benchmark opening")
+
+    def prepare():
+        return [copy.deepcopy(template) for _ in range(number)]
+
+    def run(games):
+        for game in games:
+            game.make_move(move[0], move[1])
+    return time_operation(prepare, run, number, repeat, warmup)
+
+
+def bench_replay(number, repeat, warmup):
+    """Returns the time to replay RECORDED_GAME from the start, including constructing the game"""
+    moves = [(move[:2], move[2:]) for move in RECORDED_GAME]
+
+    def run(data):
+        for _ in range(number):
+            game = ChessVar()
+            for origin, destination in moves:
+                game.make_move(origin, destination)
+    return time_operation(lambda: None, run, number, repeat, warmup)
+
+
+def bench_print_board(number, repeat, warmup):
+    """Returns the time for one print_board call, with the output sent to a string buffer"""
+    game = opening_game()
+
+    def run(data):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(number):
+                game.print_board()
+    return time_operation(lambda: None, run, number, repeat, warmup)
+
+
+def measure_game_memory(count):
+    """Returns the average number of bytes allocated per game for count games, each kept alive after replaying
+    RECORDED_GAME on it"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = []
+    for _ in range(count):
+        game = ChessVar()
+        for move in RECORDED_GAME:
+            game.make_move(move[:2], move[2:])
+        games.append(game)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count
+
+
+def run_benchmarks(scale, repeat, warmup):
+    """Runs every benchmark and returns a dictionary of metric name (key) : dictionary of value and unit (value).
+    Takes parameters of a multiplier for the number of operations per batch, the number of timed batches and the
+    number of warmup batches. Lower values are better for every metric"""
+    results = {}
+
+    def record(name, seconds):
+        results[name] = {'value': seconds * 1e6, 'unit': 'us'}
+
+    record('construction', bench_construction(200 * scale, repeat, warmup))
+    for piece in PIECE_MOVES:
+        legal, illegal = PIECE_MOVES[piece]
+        record('make_move_legal_' + piece, bench_make_move(legal, True, 200 * scale, repeat, warmup))
+        record('make_move_illegal_' + piece, bench_make_move(illegal, False, 200 * scale, repeat, warmup))
+    record('full_game_replay', bench_replay(5 * scale, repeat, warmup))
+    record('print_board', bench_print_board(100 * scale, repeat, warmup))
+    results['game_memory'] = {'value': measure_game_memory(50 * scale), 'unit': 'bytes'}
+    return results
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    """Compares results with baseline metrics. Takes parameters of the two metric dictionaries and the allowed
+    fractional increases (e.g. 0.5 for 50%) for timings and for memory (metrics measured in bytes). Returns a list
+    of (name, baseline value, new value) tuples for each baseline metric that got worse by more than its threshold.
+    A metric in the baseline but missing from the results is included with a new value of None. Metrics that are
+    only in the results are new, so they're skipped"""
+    regressions = []
+    for name in baseline:
+        old = baseline[name]['value']
+        if name not in results:
+            regressions.append((name, old, None))
+            continue
+        new = results[name]['value']
+        allowed = memory_threshold if baseline[name]['unit'] == 'bytes' else threshold
+        if new > old * (1 + allowed):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def check_baseline(results, baseline_path, threshold, memory_threshold, require_baseline):
+    """Compares results with the baseline file and prints any regressions. Takes parameters of the metric
+    dictionary, the baseline file's path, the timing and memory thresholds, and whether a missing baseline file
+    counts as a failure. Returns the exit status: 1 if there's a regression (or a required baseline is missing),
+    and 0 otherwise"""
+    try:
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)['metrics']
+    except FileNotFoundError:
+        print(f"no baseline at {baseline_path}, run with --save-baseline to create one")
+        return 1 if require_baseline else 0
+
+    regressions = compare(results, baseline, threshold, memory_threshold)
+    for name, old, new in regressions:
+        if new is None:
+            print(f"REGRESSION {name}: in the baseline but not measured")
+        else:
+            print(f"REGRESSION {name}: {old:.2f} -> {new:.2f} ({(new / old - 1) * 100:.0f}% worse)")
+    if regressions:
+        return 1
+    print(f"no metric worse than {baseline_path} by more than {threshold * 100:.0f}% (timings) or "
+          f"{memory_threshold * 100:.0f}% (memory)")
+    return 0
+
+
+def main():
+    """Holds the code to be executed as script"""
+    parser = argparse.ArgumentParser(description="Benchmark ChessVar and check for performance regressions.")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="file the JSON results are written to")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="JSON file holding the baseline results")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to the baseline file")
+    parser.add_argument('--require-baseline', action='store_true',
+                        help="fail if the baseline file doesn't exist, rather than skipping the comparison")
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help="allowed fractional increase in a timing over the baseline (default 0.5)")
+    parser.add_argument('--memory-threshold', type=float, default=0.05,
+                        help="allowed fractional increase in memory over the baseline (default 0.05)")
+    parser.add_argument('--repeat', type=int, default=7, help="number of timed runs per metric (default 7)")
+    parser.add_argument('--warmup', type=int, default=2, help="number of untimed runs per metric (default 2)")
+    parser.add_argument('--scale', type=int, default=1, help="multiplier for operations per timed run (default 1)")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scale, args.repeat, args.warmup)
+    report = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'metrics': results}
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    for name in results:
+        print(f"{name:28} {results[name]['value']:12.2f} {results[name]['unit']}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    return check_baseline(results, args.baseline, args.threshold, args.memory_threshold, args.require_baseline)
+
+
+if __name__ == '__main__':
+    """Runs the main function as a script"""
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# Description: Unit tests for ChessVar. Run with "python -m unittest test_ChessVar" (or pytest).
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+from ChessVar import AnalysisSession, ChessVar, GameStore
+
+SQUARES = [column + str(rank) for rank in range(8, 0, -1) for column in 'abcdefgh']
+
+
+class TestIsLegal(unittest.TestCase):
+    """Tests for is_legal and its cache"""
+
+    def test_is_legal_matches_make_move(self):
+        """is_legal agrees with make_move for every origin and destination, and doesn't change the game"""
+        game = ChessVar()
+        game.make_move("e2", "e4")
+        game.make_move("d7", "d5")
+        key = game.get_position_key()
+        answers = {(origin, destination): game.is_legal(origin, destination)
+                   for origin in SQUARES for destination in SQUARES}
+        self.assertEqual(game.get_position_key(), key)
+        for move in answers:
+            trial = ChessVar()
+            trial.make_move("e2", "e4")
+            trial.make_move("d7", "d5")
+            self.assertEqual(trial.make_move(move[0], move[1]), answers[move], move)
+
+    def test_invalid_locations(self):
+        """squares that aren't on the board are never legal"""
+        game = ChessVar()
+        self.assertFalse(game.is_legal("z9", "a3"))
+        self.assertFalse(game.is_legal("a2", "a9"))
+
+    def test_cache_statistics(self):
+        """a repeated query is a hit, a new one is a miss"""
+        game = ChessVar()
+        game.is_legal("a2", "a4")
+        game.is_legal("a2", "a4")
+        game.is_legal("a2", "a5")
+        self.assertEqual(game.get_legal_cache_info(), {'hits': 1, 'misses': 2, 'maxsize': 1024, 'currsize': 2})
+
+    def test_make_move_not_counted(self):
+        """moves actually played don't change the cache statistics"""
+        game = ChessVar()
+        game.is_legal("e2", "e4")
+        self.assertTrue(game.make_move("e2", "e4"))
+        game.get_legal_moves()
+        self.assertTrue(game.make_move("e7", "e5"))
+        self.assertEqual(game.get_legal_cache_info()['hits'], 0)
+        self.assertEqual(game.get_legal_cache_info()['misses'], 1)
+
+    def test_cache_is_bounded(self):
+        """the least recently used entry is dropped once the cache is full"""
+        game = ChessVar(legal_cache_size=2)
+        game.is_legal("a2", "a3")
+        game.is_legal("b2", "b3")
+        game.is_legal("a2", "a3")
+        game.is_legal("c2", "c3")
+        self.assertEqual(game.get_legal_cache_info()['currsize'], 2)
+        game.is_legal("a2", "a3")
+        self.assertEqual(game.get_legal_cache_info()['hits'], 2)
+        game.is_legal("b2", "b3")
+        self.assertEqual(game.get_legal_cache_info()['misses'], 4)
+
+    def test_cache_cleared_by_move(self):
+        """making a move empties the cache, so answers for the old position aren't reused"""
+        game = ChessVar()
+        self.assertTrue(game.is_legal("e2", "e4"))
+        self.assertTrue(game.make_move("e2", "e4"))
+        self.assertEqual(game.get_legal_cache_info()['currsize'], 0)
+        self.assertFalse(game.is_legal("e2", "e4"))
+        self.assertTrue(game.is_legal("e7", "e5"))
+
+    def test_cache_cleared_by_game_state(self):
+        """a finished game has no legal moves, even for moves cached before it finished"""
+        game = ChessVar()
+        self.assertTrue(game.is_legal("e2", "e4"))
+        game.set_game_state("BLACK_WON")
+        self.assertFalse(game.is_legal("e2", "e4"))
+
+    def test_get_legal_moves(self):
+        """there are 20 legal moves from the start, and is_legal answers from them"""
+        game = ChessVar()
+        moves = game.get_legal_moves()
+        self.assertEqual(len(moves), 20)
+        self.assertIn(("g1", "f3"), moves)
+        self.assertTrue(game.is_legal("g1", "f3"))
+        self.assertFalse(game.is_legal("g1", "g3"))
+        self.assertEqual(game.get_legal_cache_info()['misses'], 0)
+
+    def test_capturing_white_king_wins(self):
+        """black capturing the white king ends the game"""
+        game = ChessVar()
+        for move in [("f2", "f3"), ("e7", "e5"), ("e1", "f2"), ("d8", "h4"), ("a2", "a3"), ("h4", "f2")]:
+            self.assertTrue(game.make_move(move[0], move[1]), move)
+        self.assertEqual(game.get_game_state(), "BLACK_WON")
+
+
+def wait_for(session, timeout=30):
+    """Waits for the session's background search to finish, failing if it takes longer than timeout seconds"""
+    end = time.monotonic() + timeout
+    while session.is_running():
+        if time.monotonic() > end:
+            raise AssertionError("search didn't finish")
+        time.sleep(0.01)
+
+
+class TestAnalysisSession(unittest.TestCase):
+    """Tests for AnalysisSession"""
+
+    def test_search_finds_replies(self):
+        """the search looks at every legal move and reports its progress"""
+        progress = []
+        game = ChessVar()
+        session = AnalysisSession(game, lambda completed, total: progress.append((completed, total)))
+        session.start()
+        wait_for(session)
+        self.assertIsNone(session.get_error())
+        self.assertEqual(session.get_progress(), (20, 20))
+        self.assertEqual(progress[-1], (20, 20))
+        self.assertEqual(len(session.get_results()[("e2", "e4")]), 20)
+        session.stop()
+
+    def test_make_move_reuses_results(self):
+        """after a move the search had looked at, the game answers legality from the search's results"""
+        game = ChessVar()
+        session = AnalysisSession(game)
+        session.start()
+        wait_for(session)
+        self.assertTrue(session.make_move("e2", "e4"))
+        session.stop()
+        self.assertIn(("e7", "e5"), game.get_legal_moves())
+        self.assertTrue(game.is_legal("e7", "e5"))
+        self.assertEqual(game.get_legal_cache_info()['misses'], 0)
+        self.assertEqual(sorted(game.get_legal_moves()), sorted(game.copy_game().get_legal_moves()))
+
+    def test_cancel_and_restart(self):
+        """stop cancels a search partway through, and a later start searches again from the beginning"""
+        reached = threading.Event()
+        release = threading.Event()
+
+        def hold(completed, total):
+            # keep the search waiting after its first move until the test lets it go
+            reached.set()
+            release.wait(5)
+        game = ChessVar()
+        session = AnalysisSession(game, hold)
+        session.start()
+        self.assertTrue(reached.wait(5))
+        self.assertTrue(session.is_running())
+        stopper = threading.Thread(target=session.stop)
+        stopper.start()
+        # give stop time to cancel the search before the callback returns
+        time.sleep(0.1)
+        release.set()
+        stopper.join(5)
+        self.assertFalse(session.is_running())
+        self.assertLess(session.get_progress()[0], 20)
+        self.assertIsNone(session.get_error())
+
+        # release stays set, so the restarted search runs to the end
+        session.start()
+        wait_for(session)
+        self.assertEqual(session.get_progress(), (20, 20))
+        session.stop()
+
+    def test_make_move_restarts_search(self):
+        """a started session searches the new position after each move"""
+        game = ChessVar()
+        session = AnalysisSession(game)
+        session.start()
+        session.make_move("e2", "e4")
+        wait_for(session)
+        self.assertEqual(game.get_whose_turn(), "black")
+        self.assertEqual(session.get_progress(), (20, 20))
+        self.assertIn(("e7", "e5"), session.get_results())
+        session.stop()
+
+    def test_error_is_reported(self):
+        """an exception in the search stops it and is available from get_error"""
+        def fail(completed, total):
+            raise ValueError("callback failed")
+        session = AnalysisSession(ChessVar(), fail)
+        session.start()
+        wait_for(session)
+        self.assertIsInstance(session.get_error(), ValueError)
+        self.assertEqual(session.get_progress(), (1, 20))
+
+    def test_copy_game(self):
+        """copy_game gives an independent game in the same position"""
+        game = ChessVar()
+        game.make_move("e2", "e4")
+        copied = game.copy_game()
+        self.assertEqual(copied.get_position_key(), game.get_position_key())
+        copied.make_move("e7", "e5")
+        self.assertIsNone(game.get_game_board()[3]['e5'])
+        self.assertFalse(game.get_game_board()[4]['e4'] is copied.get_game_board()[4]['e4'])
+
+
+def play_in_worker(name, index, moves):
+    """Attaches to a GameStore by name and plays moves on the game at index. Used by TestGameStore as a worker
+    process target"""
+    store = GameStore(name=name)
+    for move in moves:
+        store.apply_move(index, move[0], move[1])
+    store.close()
+
+
+class TestGameStore(unittest.TestCase):
+    """Tests for GameStore"""
+
+    def setUp(self):
+        self.store = GameStore(capacity=4)
+
+    def tearDown(self):
+        self.store.close()
+        self.store.unlink()
+
+    def test_new_games_start_from_standard_position(self):
+        """every record starts as a new game"""
+        for index in range(4):
+            self.assertEqual(self.store.load_game(index).get_position_key(), ChessVar().get_position_key())
+            self.assertEqual(self.store.get_whose_turn(index), "white")
+            self.assertEqual(self.store.get_game_state(index), "UNFINISHED")
+
+    def test_save_load_round_trip(self):
+        """a saved game loads back in the same position, with the same capture counts"""
+        game = ChessVar()
+        for move in [("e2", "e4"), ("d7", "d5"), ("e4", "d5"), ("d8", "d5")]:
+            game.make_move(move[0], move[1])
+        self.store.save_game(2, game)
+        loaded = self.store.load_game(2)
+        self.assertEqual(loaded.get_position_key(), game.get_position_key())
+        self.assertEqual(loaded.get_captured_by_white(), game.get_captured_by_white())
+        self.assertEqual(loaded.get_captured_by_black(), game.get_captured_by_black())
+
+    def test_apply_move_matches_chessvar(self):
+        """apply_move gives the same result as make_move, and leaves the record alone for an illegal move"""
+        game = ChessVar()
+        moves = [("f2", "f3"), ("e7", "e5"), ("e1", "f2"), ("d8", "h4"), ("a2", "a3"), ("h4", "f2")]
+        for move in moves:
+            self.assertTrue(self.store.apply_move(0, move[0], move[1]))
+            game.make_move(move[0], move[1])
+            self.assertEqual(self.store.load_game(0).get_position_key(), game.get_position_key())
+        self.assertEqual(self.store.get_game_state(0), "BLACK_WON")
+        self.assertFalse(self.store.apply_move(1, "a2", "a5"))
+        self.assertEqual(self.store.load_game(1).get_position_key(), ChessVar().get_position_key())
+
+    def test_workers_apply_moves_in_place(self):
+        """moves played by worker processes are seen by the process that created the store"""
+        moves = [("e2", "e4"), ("e7", "e5"), ("g1", "f3")]
+        workers = [multiprocessing.Process(target=play_in_worker, args=(self.store.get_name(), index, moves[:index]))
+                   for index in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        for index in range(4):
+            game = ChessVar()
+            for move in moves[:index]:
+                game.make_move(move[0], move[1])
+            self.assertEqual(self.store.load_game(index).get_position_key(), game.get_position_key())
+
+    def test_worker_outside_multiprocessing(self):
+        """a separate Python process attaching by name doesn't remove the store when it exits"""
+        code = ("from ChessVar import GameStore\n"
+                "store = GameStore(name=%r)\n"
+                "store.apply_move(1, 'e2', 'e4')\n"
+                "store.close()\n" % self.store.get_name())
+        worker = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(worker.returncode, 0, worker.stderr)
+        self.assertNotIn("leaked", worker.stderr)
+        attached = GameStore(name=self.store.get_name())
+        self.assertEqual(attached.get_whose_turn(1), "black")
+        attached.close()
+
+    def test_large_store(self):
+        """every record of a new store holds the standard start"""
+        store = GameStore(capacity=1000)
+        try:
+            start = ChessVar().get_position_key()
+            for index in (0, 1, 500, 999):
+                self.assertEqual(store.load_game(index).get_position_key(), start)
+        finally:
+            store.close()
+            store.unlink()
+
+    def test_attach_by_name(self):
+        """a store attached by name sees the same capacity and games"""
+        self.store.apply_move(3, "b1", "c3")
+        attached = GameStore(name=self.store.get_name())
+        self.assertEqual(attached.get_capacity(), 4)
+        self.assertEqual(attached.get_whose_turn(3), "black")
+        attached.close()
+
+    def test_index_out_of_range(self):
+        """indexes outside the store raise IndexError"""
+        with self.assertRaises(IndexError):
+            self.store.load_game(4)
+
+
+if __name__ == '__main__':
+    unittest.main()
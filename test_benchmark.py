@@ -0,0 +1,97 @@
+# Description: Unit tests for the regression check in benchmark.py. Run with "python -m unittest test_benchmark"
+# (or pytest).
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import benchmark
+
+BASELINE = {'construction': {'value': 10.0, 'unit': 'us'},
+            'game_memory': {'value': 1000.0, 'unit': 'bytes'}}
+
+
+class TestCompare(unittest.TestCase):
+    """Tests for benchmark.compare"""
+
+    def test_within_thresholds(self):
+        """metrics within their thresholds pass"""
+        results = {'construction': {'value': 14.0, 'unit': 'us'},
+                   'game_memory': {'value': 1040.0, 'unit': 'bytes'}}
+        self.assertEqual(benchmark.compare(results, BASELINE, 0.5, 0.05), [])
+
+    def test_timing_regression(self):
+        """a timing past the threshold fails"""
+        results = {'construction': {'value': 16.0, 'unit': 'us'},
+                   'game_memory': {'value': 1000.0, 'unit': 'bytes'}}
+        self.assertEqual(benchmark.compare(results, BASELINE, 0.5, 0.05), [('construction', 10.0, 16.0)])
+
+    def test_memory_regression(self):
+        """memory past the memory threshold fails, even though it's well under the timing threshold"""
+        results = {'construction': {'value': 10.0, 'unit': 'us'},
+                   'game_memory': {'value': 1100.0, 'unit': 'bytes'}}
+        self.assertEqual(benchmark.compare(results, BASELINE, 0.5, 0.05), [('game_memory', 1000.0, 1100.0)])
+
+    def test_missing_metric(self):
+        """a baseline metric that wasn't measured fails"""
+        results = {'construction': {'value': 10.0, 'unit': 'us'}}
+        self.assertEqual(benchmark.compare(results, BASELINE, 0.5, 0.05), [('game_memory', 1000.0, None)])
+
+    def test_new_metric_ignored(self):
+        """a metric that's only in the new results is ignored"""
+        results = dict(BASELINE)
+        results['print_board'] = {'value': 99.0, 'unit': 'us'}
+        self.assertEqual(benchmark.compare(results, BASELINE, 0.5, 0.05), [])
+
+
+class TestCheckBaseline(unittest.TestCase):
+    """Tests for the exit status from benchmark.check_baseline"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'baseline.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check(self, results, require_baseline=False):
+        """runs check_baseline with the default thresholds, hiding its output"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return benchmark.check_baseline(results, self.path, 0.5, 0.05, require_baseline)
+
+    def test_missing_baseline(self):
+        """a missing baseline passes unless it's required"""
+        self.assertEqual(self.check(BASELINE), 0)
+        self.assertEqual(self.check(BASELINE, require_baseline=True), 1)
+
+    def test_regression_fails(self):
+        """a regression against the baseline file gives exit status 1"""
+        with open(self.path, 'w') as baseline_file:
+            json.dump({'metrics': BASELINE}, baseline_file)
+        self.assertEqual(self.check(BASELINE, require_baseline=True), 0)
+        results = dict(BASELINE)
+        results['construction'] = {'value': 20.0, 'unit': 'us'}
+        self.assertEqual(self.check(results), 1)
+
+
+class TestPieceMoves(unittest.TestCase):
+    """Tests that the benchmark moves do what their names say"""
+
+    def test_piece_moves(self):
+        """each legal move is accepted and each illegal move is rejected after the opening"""
+        for piece in benchmark.PIECE_MOVES:
+            legal, illegal = benchmark.PIECE_MOVES[piece]
+            self.assertTrue(benchmark.opening_game().make_move(legal[0], legal[1]), piece)
+            self.assertFalse(benchmark.opening_game().make_move(illegal[0], illegal[1]), piece)
+
+    def test_wrong_expectation_raises(self):
+        """bench_make_move refuses to time a move that doesn't give the expected result"""
+        with self.assertRaises(RuntimeError):
+            benchmark.bench_make_move(("d2", "d4"), False, 1, 1, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()